@@ -8,6 +8,7 @@ setup(
         'numpy',
         'librosa',
         'mido',
+        'soundfile',
         'torch',
         'torchaudio',
         'demucs @ git+https://github.com/adefossez/demucs.git',
@@ -2,7 +2,8 @@ import os
 import pytest
 import numpy as np
 from scipy.io.wavfile import write as write_wav
-from wave2midi import WaveToMIDIConverter
+import wave2midi
+from wave2midi import NoteArray, TorchaudioDemucsSeparator, WaveToMIDIConverter, _group_notes, _group_notes_np, _load_audio
 
 @pytest.fixture
 def converter():
@@ -18,7 +19,10 @@ def converter():
 
     # Basic config for testing
     config = {
-        "sample_rate": 22050
+        "sample_rate": 22050,
+        # The default frame and hop durations, in samples at 22050 Hz
+        "frame_length": 2048,
+        "hop_length": 512
     }
 
     # Create converter instance
@@ -67,6 +71,229 @@ def test_detect_notes_sine_wave(converter, simple_wav_file):
     detected_duration = notes[0]['duration']
     assert 0.8 < detected_duration < 1.2, f"Expected duration around 1.0s, got {detected_duration}"
 
+def test_detect_notes_default_sample_rate(simple_wav_file):
+    """Test that the default config detects notes at its reduced sample rate."""
+    wav_path, _, _ = simple_wav_file
+    converter = WaveToMIDIConverter()
+
+    import librosa
+    audio, sr = librosa.load(wav_path, sr=converter.config['sample_rate'], mono=True)
+    assert sr == 11025
+
+    notes = converter.detect_notes(audio, sr)
+    assert len(notes) > 0
+    assert notes[0]['pitch'] == 69
+    assert 0.8 < notes[0]['duration'] < 1.2
+
+def test_detect_notes_frames_follow_decimation(converter, simple_wav_file, mocker):
+    """Test that frame and hop lengths are input-rate samples, scaled down with pYIN's decimation."""
+    import warnings
+    import librosa
+    wav_path, sample_rate, _ = simple_wav_file
+    audio, sr = librosa.load(wav_path, sr=sample_rate, mono=True)
+    pyin = mocker.spy(librosa, 'pyin')
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")  # librosa warns when fmin does not fit the frame twice
+        f0, _, _, hop_time = converter._track_pitch(audio, sr)
+
+    assert pyin.call_args.kwargs['sr'] == 11025
+    assert pyin.call_args.kwargs['frame_length'] == 1024 and pyin.call_args.kwargs['hop_length'] == 256
+    assert hop_time == converter.config["hop_length"] / sr
+    assert f0.shape[-1] == 1 + len(audio) // converter.config["hop_length"]
+
+def test_detect_notes_snaps_fmin_to_note_grid(converter, simple_wav_file, mocker):
+    """Test that pYIN's semitone bins start on a MIDI note when fmin is off the grid."""
+    import librosa
+    wav_path, sample_rate, _ = simple_wav_file
+    audio, sr = librosa.load(wav_path, sr=sample_rate, mono=True)
+    pyin = mocker.spy(librosa, 'pyin')
+    converter.config["fmin"] = 30.5  # 38 cents below B0
+
+    notes = converter.detect_notes(audio, sr)
+
+    assert pyin.call_args.kwargs['fmin'] == pytest.approx(librosa.midi_to_hz(23))
+    assert notes[0]['pitch'] == 69
+
+def test_detect_notes_skips_silence(converter, mocker):
+    """Test that silent audio returns no notes without running pitch detection."""
+    track_pitch = mocker.patch.object(converter, '_track_pitch')
+
+    assert len(converter.detect_notes(np.zeros(22050, dtype=np.float32), 22050)) == 0
+    assert len(converter.detect_notes(np.full(22050, 1e-4, dtype=np.float32), 22050)) == 0
+    track_pitch.assert_not_called()
+
+def test_group_notes_matches_numpy_reference():
+    """Test that the compiled note grouping agrees with the NumPy implementation."""
+    rng = np.random.default_rng(0)
+    frames = np.sort(rng.choice(5000, size=2000, replace=False))
+    pitches = np.repeat(rng.integers(40, 80, size=200), 10).astype(np.int16)
+    velocities = rng.uniform(1, 127, size=2000)
+    args = (frames, pitches, velocities, 512 / 22050, 0.1, 2.0)
+
+    expected = _group_notes_np(*args)
+    actual = _group_notes(*args)
+
+    np.testing.assert_array_equal(actual[0], expected[0])
+    np.testing.assert_allclose(actual[1], expected[1])
+    np.testing.assert_allclose(actual[2], expected[2])
+    np.testing.assert_array_equal(actual[3], expected[3])
+
+def test_group_notes_splits_rests_and_retriggers():
+    """Test that a rest or a pitch change ends a note, and a repeated pitch starts a new one."""
+    hop_time = 0.05
+    # 60 for frames 0-9, rest for 10-19, 60 again for 20-29, then 62 for 30-39
+    frames = np.concatenate([np.arange(0, 10), np.arange(20, 40)])
+    pitches = np.array([60] * 20 + [62] * 10, dtype=np.int16)
+    velocities = np.linspace(10, 100, 30)
+
+    for group in (_group_notes, _group_notes_np):
+        pitch, start, duration, velocity = group(frames, pitches, velocities, hop_time, 0.1, 2.0)
+        np.testing.assert_array_equal(pitch, [60, 60, 62])
+        np.testing.assert_allclose(start, [0.0, 1.0, 1.5])
+        np.testing.assert_allclose(duration, [0.5, 0.5, 0.5])
+        assert velocity[-1] == 100
+
+def test_group_notes_splits_long_notes():
+    """Test that a note held past max_duration continues as consecutive notes."""
+    hop_time = 0.05
+    frames = np.arange(100)  # 5 seconds of one pitch
+    pitches = np.full(100, 60, dtype=np.int16)
+    velocities = np.full(100, 80.0)
+
+    for group in (_group_notes, _group_notes_np):
+        pitch, start, duration, velocity = group(frames, pitches, velocities, hop_time, 0.1, 2.0)
+        np.testing.assert_array_equal(pitch, [60, 60, 60])
+        np.testing.assert_allclose(start, [0.0, 2.0, 4.0])
+        np.testing.assert_allclose(duration, [2.0, 2.0, 1.0])
+        np.testing.assert_array_equal(velocity, [80, 80, 80])
+
+def test_torchcrepe_hop_time_matches_resampled_hop(mocker):
+    """Test that torchcrepe frames are timed by its truncated 16 kHz hop."""
+    torch = pytest.importorskip("torch")
+    torchcrepe = pytest.importorskip("torchcrepe")
+    converter = WaveToMIDIConverter({"pitch_detection_method": "torchcrepe", "hop_length": 256})
+    mocker.patch.object(torchcrepe, 'predict', return_value=(torch.zeros(1, 10), torch.zeros(1, 10)))
+
+    *_, hop_time = converter._track_pitch(np.zeros(11025, dtype=np.float32), 11025)
+
+    assert hop_time == int(256 * 16000 / 11025) / 16000
+
+def test_detect_notes_batch_torchcrepe_tracks_each_stem(mocker):
+    """Test that torchcrepe is given one (1, samples) signal per non-silent stem."""
+    torch = pytest.importorskip("torch")
+    torchcrepe = pytest.importorskip("torchcrepe")
+    converter = WaveToMIDIConverter({"pitch_detection_method": "torchcrepe", "sample_rate": 11025})
+
+    def predict(audio, sample_rate, hop_length, *args, **kwargs):
+        assert audio.shape[0] == 1
+        n_frames = 1 + int(audio.shape[-1] * torchcrepe.SAMPLE_RATE / sample_rate) // int(
+            hop_length * torchcrepe.SAMPLE_RATE / sample_rate)
+        return torch.full((1, n_frames), 440.0), torch.ones(1, n_frames)
+    predict = mocker.patch.object(torchcrepe, 'predict', side_effect=predict)
+
+    t = np.arange(11025) / 11025
+    tone = (0.5 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+    notes = converter.detect_notes_batch({'vocals': tone, 'other': tone[:5512], 'bass': np.zeros_like(tone)}, 11025)
+
+    assert predict.call_count == 2
+    assert notes['vocals'].pitch.tolist() == [69] and notes['other'].pitch.tolist() == [69]
+    assert notes['other'].duration[0] < notes['vocals'].duration[0]
+    assert len(notes['bass']) == 0
+
+def test_load_audio_fallback_keeps_channel_axis(simple_wav_file, mocker):
+    """Test that the librosa fallback returns (channels, samples) for mono files."""
+    wav_path, sample_rate, _ = simple_wav_file
+    import soundfile as sf
+    mocker.patch('soundfile.read', side_effect=sf.LibsndfileError(0))
+
+    audio = _load_audio(str(wav_path), sample_rate, mono=False)
+
+    assert audio.shape == (1, sample_rate)
+
+def test_torchaudio_separator_accepts_1d_mono(mocker):
+    """Test that 1-D mono input is duplicated to stereo before separation."""
+    torch = pytest.importorskip("torch")
+    pytest.importorskip("torchaudio")
+
+    separator = object.__new__(TorchaudioDemucsSeparator)
+    separator.device = "cpu"
+    separator.sample_rate = 44100
+    separator.gc_every = 16
+    separator._separations = 0
+    separator.model = mocker.Mock(sources=["drums", "bass", "other", "vocals"])
+    mocker.patch('wave2midi._load_audio', return_value=np.random.default_rng(0).standard_normal(4410).astype(np.float32))
+    windows = mocker.patch.object(separator, '_separate_windows', side_effect=lambda w: torch.zeros(4, w.shape[-1]))
+
+    stems = separator.separate("mono.wav", 44100)
+
+    assert windows.call_args[0][0].shape == (2, 4410)
+    assert stems["vocals"].shape == (4410,)
+
+def test_notes_to_midi_bytes_matches_mido(converter):
+    """Test that the direct MIDI writer produces the same file as mido."""
+    import io
+    rng = np.random.default_rng(0)
+    notes = [
+        {'pitch': int(p), 'start_time': float(s), 'duration': float(d), 'velocity': int(v)}
+        for p, s, d, v in zip(
+            rng.integers(21, 109, 300), np.cumsum(rng.uniform(0, 0.8, 300)),
+            rng.uniform(0.1, 2.0, 300), rng.integers(1, 128, 300)
+        )
+    ]
+
+    expected = io.BytesIO()
+    converter.notes_to_midi(notes, 'bass', 97).save(file=expected)
+
+    assert converter.notes_to_midi_bytes(notes, 'bass', 97) == expected.getvalue()
+    assert converter.notes_to_midi_bytes(NoteArray.from_dicts(notes), 'bass', 97) == expected.getvalue()
+
+def test_save_midi_writers_match(converter, tmp_path):
+    """Test that the fast and mido MIDI writers save identical files."""
+    notes = NoteArray.from_dicts([
+        {'pitch': 60, 'start_time': 0.25, 'duration': 0.5, 'velocity': 90},
+        {'pitch': 67, 'start_time': 1.0, 'duration': 1.5, 'velocity': 70},
+    ])
+
+    fast_path = converter._save_midi(notes, 'bass', 'fast', str(tmp_path))
+    converter.config["fast_midi_writer"] = False
+    mido_path = converter._save_midi(notes, 'bass', 'mido', str(tmp_path))
+
+    with open(fast_path, 'rb') as fast, open(mido_path, 'rb') as slow:
+        assert fast.read() == slow.read()
+
+def test_notes_to_midi_folds_rests_into_note_on(converter):
+    """Test that rests become note_on delta times rather than pitch-0 events."""
+    notes = [
+        {'pitch': 60, 'start_time': 0.5, 'duration': 0.5, 'velocity': 90},
+        {'pitch': 62, 'start_time': 1.5, 'duration': 1.0, 'velocity': 90},
+        {'pitch': 64, 'start_time': 2.0, 'duration': 0.5, 'velocity': 90},  # overlaps the previous note
+    ]
+
+    track = converter.notes_to_midi(notes, 'piano', 120).tracks[0]
+    note_events = [(msg.type, msg.note, msg.time) for msg in track if msg.type in ('note_on', 'note_off')]
+
+    assert note_events == [
+        ('note_on', 60, 480), ('note_off', 60, 480),
+        ('note_on', 62, 480), ('note_on', 64, 480),
+        ('note_off', 62, 480), ('note_off', 64, 0),
+    ]
+
+def test_notes_to_midi_ends_notes_before_retriggering(converter):
+    """Test that a note ending as the next starts is released before the new note_on."""
+    notes = NoteArray.from_dicts([
+        {'pitch': 60, 'start_time': 0.5, 'duration': 0.5, 'velocity': 90},
+        {'pitch': 60, 'start_time': 0.0, 'duration': 0.5, 'velocity': 70},
+    ])
+
+    track = converter.notes_to_midi(notes, 'piano', 120).tracks[0]
+    note_events = [(msg.type, msg.velocity, msg.time) for msg in track if msg.type in ('note_on', 'note_off')]
+
+    assert note_events == [
+        ('note_on', 70, 0), ('note_off', 0, 480),
+        ('note_on', 90, 0), ('note_off', 0, 480),
+    ]
+
 def test_convert_creates_midi_files(converter, simple_wav_file, tmp_path):
     """Test that the convert function creates MIDI files."""
     wav_path, _, _ = simple_wav_file
@@ -104,6 +331,20 @@ def test_convert_creates_midi_files(converter, simple_wav_file, tmp_path):
         unexpected_midi_path = output_dir / f"test_{stem}.mid"
         assert not os.path.exists(unexpected_midi_path), f"MIDI file created for silent stem: {stem}"
 
+def test_convert_skips_configured_stems(converter, simple_wav_file, tmp_path, mocker):
+    """Test that stems listed in skip_stems are not pitch-tracked."""
+    wav_path, sample_rate, _ = simple_wav_file
+
+    import librosa
+    audio, _ = librosa.load(wav_path, sr=sample_rate, mono=True)
+    converter.separate_stems = lambda path: {'drums': audio, 'other': audio}
+    detect = mocker.spy(converter, 'detect_notes_batch')
+
+    midi_files = converter.convert(str(wav_path), str(tmp_path / "output"))
+
+    assert [os.path.basename(f) for f in midi_files] == ["test_other.mid"]
+    assert list(detect.call_args[0][0]) == ['other']
+
 def test_main_function_dry_run(mocker, tmp_path):
     """Test the main CLI function with a dry run mock."""
     # Mock the WaveToMIDIConverter to avoid actual processing
@@ -129,3 +370,225 @@ def test_main_function_dry_run(mocker, tmp_path):
 
     # Assert that convert was called
     mock_converter_instance.convert.assert_called_once_with(str(input_wav), str(output_dir))
+
+def test_convert_batch_runs_demucs_once(converter, simple_wav_file, tmp_path, mocker):
+    """Test that converting several files separates them in a single demucs run."""
+    wav_path, sample_rate, _ = simple_wav_file
+    second_wav = tmp_path / "second.wav"
+    second_wav.write_bytes(wav_path.read_bytes())
+    output_dir = tmp_path / "output"
+
+    import librosa
+    audio, _ = librosa.load(wav_path, sr=sample_rate, mono=True)
+
+    run_demucs = mocker.patch.object(
+        converter, '_run_demucs',
+        side_effect=lambda paths, temp_dir: [tmp_path / f"stems_{i}" for i in range(len(paths))]
+    )
+    mocker.patch.object(converter, '_load_stems', return_value={'other': audio})
+
+    midi_files = converter.convert([str(wav_path), str(second_wav)], str(output_dir))
+
+    run_demucs.assert_called_once()
+    assert sorted(os.path.basename(f) for f in midi_files) == ["second_other.mid", "test_other.mid"]
+
+def test_convert_batch_shares_worker_pool(simple_wav_file, tmp_path, mocker):
+    """Test that every file in a batch is tracked in the same worker pool."""
+    wav_path, sample_rate, _ = simple_wav_file
+    second_wav = tmp_path / "second.wav"
+    second_wav.write_bytes(wav_path.read_bytes())
+
+    import librosa
+    audio, _ = librosa.load(wav_path, sr=sample_rate, mono=True)
+
+    converter = WaveToMIDIConverter({"stem_workers": 2})
+    mocker.patch.object(
+        converter, '_run_demucs',
+        side_effect=lambda paths, temp_dir: [tmp_path / f"stems_{i}" for i in range(len(paths))]
+    )
+    mocker.patch.object(converter, '_load_stems', return_value={'other': audio})
+    pool = mocker.spy(wave2midi, 'ProcessPoolExecutor')
+
+    midi_files = converter.convert([str(wav_path), str(second_wav)], str(tmp_path / "output"))
+
+    pool.assert_called_once_with(max_workers=2)
+    assert sorted(os.path.basename(f) for f in midi_files) == ["second_other.mid", "test_other.mid"]
+
+def test_run_demucs_uses_cpu_jobs(converter, tmp_path, mocker):
+    """Test that demucs gets the configured device, and a job count on the CPU only when set."""
+    converter.config.update({"demucs_device": "cpu", "demucs_jobs": 3})
+    mocker.patch('wave2midi.shutil.which', return_value='/usr/bin/demucs')
+    popen = mocker.patch('wave2midi.subprocess.Popen')
+    popen.return_value.stdout.__iter__.return_value = iter([])
+    popen.return_value.wait.return_value = 0
+    (tmp_path / 'separated' / 'htdemucs' / 'song').mkdir(parents=True)
+
+    list(converter._run_demucs(['song.wav'], str(tmp_path)))
+
+    cmd = popen.call_args[0][0]
+    assert cmd[:7] == ['demucs', '-n', 'htdemucs', '-d', 'cpu', '-j', '3']
+
+    converter.config["demucs_jobs"] = None
+    list(converter._run_demucs(['song.wav'], str(tmp_path)))
+
+    assert '-j' not in popen.call_args[0][0]
+
+def test_run_demucs_streams_finished_tracks(converter, tmp_path, mocker):
+    """Test that each track is handed out once demucs moves on to the next one."""
+    mocker.patch('wave2midi.shutil.which', return_value='/usr/bin/demucs')
+    popen = mocker.patch('wave2midi.subprocess.Popen')
+    process = popen.return_value
+    process.wait.return_value = 0
+    output_root = tmp_path / 'separated' / 'htdemucs'
+    for name in ('a', 'b'):
+        (output_root / name).mkdir(parents=True)
+
+    def demucs_stdout():
+        yield "Separated tracks will be stored in separated/htdemucs\n"
+        yield "Separating track a.wav\n"
+        yield "Separating track b.wav\n"
+        # Track a must be handed out before demucs gets any further
+        assert outputs == [output_root / 'a']
+    process.stdout = demucs_stdout()
+
+    outputs = []
+    for output_base in converter._run_demucs(['a.wav', 'b.wav'], str(tmp_path)):
+        outputs.append(output_base)
+
+    assert outputs == [output_root / 'a', output_root / 'b']
+
+@pytest.mark.parametrize("stem_cache", [False, True])
+def test_convert_stops_demucs_on_error(converter, simple_wav_file, tmp_path, mocker, stem_cache):
+    """Test that demucs is killed before its directory is removed when conversion fails."""
+    wav_path, _, _ = simple_wav_file
+    second_wav = tmp_path / "second.wav"
+    second_wav.write_bytes(wav_path.read_bytes() + b"\0\0")  # different contents, so no shared cache entry
+    if stem_cache:
+        converter.config["stem_cache_dir"] = str(tmp_path / "cache")
+    mocker.patch('wave2midi.shutil.which', return_value='/usr/bin/demucs')
+    popen = mocker.patch('wave2midi.subprocess.Popen')
+    process = popen.return_value
+    process.poll.return_value = None  # demucs is still running
+
+    def demucs_stdout():
+        output_root = os.path.join(popen.call_args.kwargs['cwd'], 'separated', 'htdemucs')
+        os.makedirs(os.path.join(output_root, 'test'))
+        yield "Separating track test.wav\n"
+        os.makedirs(os.path.join(output_root, 'second'))
+        yield "Separating track second.wav\n"
+    process.stdout = demucs_stdout()
+    mocker.patch.object(converter, '_load_stems', side_effect=RuntimeError("load failed"))
+
+    with pytest.raises(RuntimeError, match="load failed"):
+        converter.convert([str(wav_path), str(second_wav)], str(tmp_path / "output"))
+
+    process.kill.assert_called_once()
+
+def test_separate_stems_uses_stem_cache(converter, simple_wav_file, tmp_path, mocker):
+    """Test that demucs output is cached by file contents and reused."""
+    wav_path, _, _ = simple_wav_file
+    converter.config["stem_cache_dir"] = str(tmp_path / "cache")
+
+    def fake_demucs(paths, temp_dir):
+        output_base = tmp_path / "separated" / "test"
+        output_base.mkdir(parents=True, exist_ok=True)
+        (output_base / "other.wav").write_bytes(wav_path.read_bytes())
+        return [output_base]
+
+    run_demucs = mocker.patch.object(converter, '_run_demucs', side_effect=fake_demucs)
+
+    first = converter.separate_stems(str(wav_path))
+    second = converter.separate_stems(str(wav_path))
+
+    run_demucs.assert_called_once()
+    assert list(second) == ['other']
+    np.testing.assert_array_equal(first['other'], second['other'])
+    cache_dirs = list((tmp_path / "cache").iterdir())
+    assert len(cache_dirs) == 1 and cache_dirs[0].name.endswith("_htdemucs")
+
+def test_stem_cache_is_opt_in(simple_wav_file, tmp_path, mocker):
+    """Test that demucs stems are not cached unless stem_cache_dir is set."""
+    wav_path, _, _ = simple_wav_file
+    converter = WaveToMIDIConverter()
+    run_demucs = mocker.patch.object(converter, '_run_demucs', return_value=iter([tmp_path / "stems"]))
+    stem_cache_path = mocker.spy(converter, '_stem_cache_path')
+
+    assert list(converter._separate_demucs([str(wav_path)], str(tmp_path))) == [tmp_path / "stems"]
+
+    run_demucs.assert_called_once()
+    stem_cache_path.assert_not_called()
+
+def test_auto_pitch_detection_without_gpu(mocker):
+    """Test that the auto pitch detection method falls back to pYIN without a GPU."""
+    mocker.patch('importlib.util.find_spec', return_value=None)
+
+    converter = WaveToMIDIConverter({"pitch_detection_method": "auto"})
+
+    assert converter.config["pitch_detection_method"] == "pyin"
+
+def test_convert_stems_with_torchcrepe(tmp_path, mocker):
+    """Test that a file with several pitched stems converts end to end with torchcrepe."""
+    torch = pytest.importorskip("torch")
+    torchcrepe = pytest.importorskip("torchcrepe")
+    converter = WaveToMIDIConverter({"pitch_detection_method": "torchcrepe", "sample_rate": 11025})
+
+    def predict(audio, sample_rate, hop_length, *args, **kwargs):
+        assert tuple(audio.shape) == (1, 11025)
+        n_frames = 1 + 16000 // int(hop_length * torchcrepe.SAMPLE_RATE / sample_rate)
+        return torch.full((1, n_frames), 220.0), torch.ones(1, n_frames)
+    predict = mocker.patch.object(torchcrepe, 'predict', side_effect=predict)
+
+    tone = (0.5 * np.sin(2 * np.pi * 220 * np.arange(11025) / 11025)).astype(np.float32)
+    midi_files = converter._convert_stems({'vocals': tone, 'bass': tone, 'other': tone}, "test", str(tmp_path))
+
+    assert predict.call_count == 3
+    assert [os.path.basename(f) for f in midi_files] == ["test_vocals.mid", "test_bass.mid", "test_other.mid"]
+
+def test_config_from_json_path(tmp_path):
+    """Test that the converter accepts a JSON config file path and derives the model once."""
+    config_path = tmp_path / "config.json"
+    config_path.write_text('{"stem_count": 6, "output_bpm": 90}')
+
+    converter = WaveToMIDIConverter(str(config_path))
+
+    assert converter.config["output_bpm"] == 90
+    assert converter.config["model_type"] == "htdemucs_6s"
+
+def test_unknown_separation_backend_raises():
+    """Test that an unsupported separation backend is rejected up front."""
+    with pytest.raises(ValueError):
+        WaveToMIDIConverter({"separation_backend": "spleeter"})
+
+def test_detect_notes_batch_matches_single(converter, simple_wav_file):
+    """Test that batched note detection matches per-stem detection and skips silence."""
+    wav_path, sample_rate, _ = simple_wav_file
+
+    import librosa
+    audio, sr = librosa.load(wav_path, sr=sample_rate, mono=True)
+
+    stems = {'vocals': np.zeros_like(audio), 'other': audio, 'bass': audio[:sr // 2]}
+    notes = converter.detect_notes_batch(stems, sr)
+
+    assert len(notes['vocals']) == 0
+    assert notes['other'].to_dicts() == converter.detect_notes(audio, sr).to_dicts()
+    assert notes['bass'].to_dicts() == converter.detect_notes(audio[:sr // 2], sr).to_dicts()
+
+def test_convert_stems_worker_processes(simple_wav_file, tmp_path):
+    """Test that tracking stem tiles in worker processes writes the same MIDI files."""
+    wav_path, sample_rate, _ = simple_wav_file
+
+    import librosa
+    audio, sr = librosa.load(wav_path, sr=sample_rate, mono=True)
+    stems = {'vocals': np.zeros_like(audio), 'other': audio, 'bass': audio[:sr // 2]}
+    (tmp_path / "serial").mkdir()
+    (tmp_path / "parallel").mkdir()
+
+    serial = WaveToMIDIConverter({"stem_workers": 1})._convert_stems(stems, "test", str(tmp_path / "serial"))
+    # Short tiles split each stem across several worker tasks
+    parallel = WaveToMIDIConverter({"stem_workers": 2, "pyin_tile_seconds": 0.25})._convert_stems(
+        stems, "test", str(tmp_path / "parallel"))
+
+    assert [os.path.basename(f) for f in parallel] == ["test_other.mid", "test_bass.mid"]
+    for serial_file, parallel_file in zip(serial, parallel):
+        with open(serial_file, 'rb') as f1, open(parallel_file, 'rb') as f2:
+            assert f1.read() == f2.read()
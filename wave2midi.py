@@ -3,75 +3,531 @@ wave2midi - Convert WAV files to MIDI by separating into stems
 """
 
 import os
+import gc
 import sys
 import argparse
 import json
+import hashlib
+import importlib.util
+import struct
 import warnings
 import subprocess
 import shutil
 import tempfile
-from typing import List, Dict, Tuple, Optional
+from contextlib import closing, nullcontext
+from dataclasses import dataclass
+from functools import cached_property
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import TYPE_CHECKING, IO, Iterator, List, Dict, Tuple, Optional, Union
 import numpy as np
-import librosa
-import mido
-from mido import MidiFile, MidiTrack, Message
-import tensorflow as tf
 from pathlib import Path
 
+if TYPE_CHECKING:
+    import mido
+
+SEPARATION_BACKENDS = ("demucs", "torchaudio")
+TICKS_PER_BEAT = 480
+NOTE_OFF = 0x80
+NOTE_ON = 0x90
+PITCH_DETECTION_METHODS = ("pyin", "torchcrepe", "auto")
+# MIDI pitch of 1 Hz: 69 - 12 * log2(440)
+_MIDI_PITCH_OFFSET = 69.0 - 12.0 * np.log2(440.0)
+
+
+def _load_audio(path: str, sample_rate: int, mono: bool = True) -> np.ndarray:
+    """
+    Load an audio file as float32, resampled to sample_rate.
+    
+    Files libsndfile can decode (WAV, FLAC, ...) are read directly with
+    soundfile, skipping librosa's decoder fallback chain; anything else
+    goes through librosa.load.
+    
+    Args:
+        path: Path to audio file
+        sample_rate: Target sample rate
+        mono: Downmix to a single channel
+        
+    Returns:
+        Audio data, shaped (samples,) when mono or (channels, samples) otherwise
+    """
+    import librosa
+    import soundfile as sf
+    
+    try:
+        audio, file_sr = sf.read(path, dtype='float32', always_2d=True)
+    except sf.LibsndfileError:
+        audio, _ = librosa.load(path, sr=sample_rate, mono=mono, dtype=np.float32)
+        # librosa drops the channel axis of mono files even when mono=False
+        return audio if mono else np.atleast_2d(audio)
+    
+    # soundfile returns (samples, channels); a strided mean over the short
+    # channel axis is several times slower than an equivalent BLAS mat-vec
+    if mono:
+        channels = audio.shape[1]
+        audio = audio @ np.full(channels, 1.0 / channels, dtype=np.float32)
+    else:
+        audio = audio.T
+    if file_sr != sample_rate:
+        audio = librosa.resample(audio, orig_sr=file_sr, target_sr=sample_rate, res_type='soxr_hq')
+    return audio
+
+
+def _write_vlq(buffer: bytearray, value: int):
+    """Append a non-negative integer to buffer as a MIDI variable-length quantity."""
+    if value < 0x80:
+        buffer.append(value)
+    elif value < 0x4000:
+        buffer.append(0x80 | (value >> 7))
+        buffer.append(value & 0x7F)
+    else:
+        encoded = [value & 0x7F]
+        value >>= 7
+        while value:
+            encoded.append(0x80 | (value & 0x7F))
+            value >>= 7
+        buffer.extend(reversed(encoded))
+
+
+# Runs within this fraction of a whole number of max_duration notes are not
+# given an extra, vanishingly short note for their floating point excess
+_SPLIT_TOLERANCE = 1e-9
+
+
+def _group_notes_np(frames: np.ndarray, pitches: np.ndarray, velocities: np.ndarray,
+                    hop_time: float, min_duration: float,
+                    max_duration: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Group voiced frames into notes with NumPy run-length encoding.
+    
+    A note is a run of consecutive voiced frames with the same pitch. A run
+    ends when the pitch changes or when more than one frame is missing, so
+    re-triggered notes and notes separated by rests stay separate. Each run
+    lasts from its first frame to the end of its last frame and takes the
+    loudest velocity in the run. Runs longer than max_duration are split
+    into consecutive notes of max_duration, plus the remainder.
+    
+    Args:
+        frames: Frame index of each voiced frame, increasing
+        pitches: MIDI pitch of each voiced frame
+        velocities: Velocity of each voiced frame
+        hop_time: Duration of one frame hop in seconds
+        min_duration: Notes shorter than this are dropped
+        max_duration: Runs longer than this are split into several notes
+        
+    Returns:
+        Tuple of (pitch, start_time, duration, velocity) arrays
+    """
+    change = np.empty(len(pitches), dtype=bool)
+    change[:1] = True
+    change[1:] = (pitches[1:] != pitches[:-1]) | (np.diff(frames) > 2)
+    starts = np.nonzero(change)[0]
+    ends = np.append(starts[1:], len(pitches)) - 1
+    
+    start_times = frames[starts] * hop_time
+    durations = (frames[ends] - frames[starts] + 1) * hop_time
+    note_velocities = np.maximum.reduceat(velocities, starts).astype(np.int16)
+    
+    # Repeat each run once per note it is split into, and number the pieces
+    pieces = np.maximum(np.ceil(durations / max_duration - _SPLIT_TOLERANCE), 1).astype(np.int64)
+    run = np.repeat(np.arange(len(starts)), pieces)
+    piece = np.arange(len(run)) - np.repeat(np.cumsum(pieces) - pieces, pieces)
+    offsets = piece * max_duration
+    
+    start_times = start_times[run] + offsets
+    durations = np.minimum(durations[run] - offsets, max_duration)
+    # Gather each note's pitch and velocity once, by the run it came from
+    keep = durations >= min_duration
+    run = run[keep]
+    return pitches[starts[run]], start_times[keep], durations[keep], note_velocities[run]
+
+
+def _group_notes_loop(frames: np.ndarray, pitches: np.ndarray, velocities: np.ndarray,
+                      hop_time: float, min_duration: float,
+                      max_duration: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Group voiced frames into notes in a single pass, for compilation with Numba.
+    
+    Produces the same notes as _group_notes_np, writing into output arrays
+    preallocated to an upper bound on the number of notes: one per frame,
+    plus one per max_duration of the time the frames span.
+    """
+    n = len(pitches)
+    capacity = n
+    if n > 0:
+        capacity += int((frames[n - 1] - frames[0] + 1) * hop_time / max_duration) + 1
+    pitch_out = np.empty(capacity, dtype=np.int16)
+    start_out = np.empty(capacity, dtype=np.float64)
+    duration_out = np.empty(capacity, dtype=np.float64)
+    velocity_out = np.empty(capacity, dtype=np.int16)
+    
+    count = 0
+    run_start = 0
+    max_velocity = 0.0
+    for i in range(n):
+        max_velocity = max(max_velocity, velocities[i])
+        if i + 1 < n and pitches[i + 1] == pitches[run_start] and frames[i + 1] - frames[i] <= 2:
+            continue
+        
+        # The run of equal pitches ends at frame i; split it into notes of
+        # at most max_duration
+        run_duration = (frames[i] - frames[run_start] + 1) * hop_time
+        pieces = max(np.ceil(run_duration / max_duration - _SPLIT_TOLERANCE), 1)
+        for piece in range(int(pieces)):
+            offset = piece * max_duration
+            duration = min(run_duration - offset, max_duration)
+            if duration >= min_duration:
+                pitch_out[count] = pitches[run_start]
+                start_out[count] = frames[run_start] * hop_time + offset
+                duration_out[count] = duration
+                velocity_out[count] = int(max_velocity)
+                count += 1
+        
+        run_start = i + 1
+        max_velocity = 0.0
+    
+    # Copy the used part so the full-size buffers are not kept alive by views
+    return (pitch_out[:count].copy(), start_out[:count].copy(),
+            duration_out[:count].copy(), velocity_out[:count].copy())
+
+
+_group_notes_kernel = None
+
+
+def _group_notes(frames: np.ndarray, pitches: np.ndarray, velocities: np.ndarray,
+                 hop_time: float, min_duration: float,
+                 max_duration: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Group voiced frames into notes with the fastest available implementation.
+    
+    The Numba kernel is compiled on first use, so importing this module (and
+    running the CLI with --help) does not pay for importing numba. Without
+    numba, the NumPy implementation is used.
+    """
+    global _group_notes_kernel
+    if _group_notes_kernel is None:
+        try:
+            import numba
+        except ImportError:  # pragma: no cover - numba ships with librosa, but may be broken on some platforms
+            _group_notes_kernel = _group_notes_np
+        else:
+            _group_notes_kernel = numba.njit(cache=True, fastmath=True)(_group_notes_loop)
+    return _group_notes_kernel(frames, pitches, velocities, hop_time, min_duration, max_duration)
+
+
+@dataclass(eq=False)
+class NoteArray:
+    """
+    Detected notes stored as parallel arrays, one element per note.
+    
+    Indexing with an integer or iterating yields notes as dictionaries with
+    pitch, start_time, duration and velocity keys, like the list of
+    dictionaries detect_notes used to return.
+    """
+    pitch: np.ndarray
+    start_time: np.ndarray
+    duration: np.ndarray
+    velocity: np.ndarray
+
+    @classmethod
+    def empty(cls) -> "NoteArray":
+        """Create a NoteArray with no notes."""
+        return cls(np.empty(0, dtype=np.int16), np.empty(0), np.empty(0), np.empty(0, dtype=np.int16))
+
+    @classmethod
+    def from_dicts(cls, notes: List[Dict]) -> "NoteArray":
+        """Create a NoteArray from a list of note dictionaries."""
+        if not notes:
+            return cls.empty()
+        return cls(
+            np.array([note['pitch'] for note in notes], dtype=np.int16),
+            np.array([note['start_time'] for note in notes], dtype=np.float64),
+            np.array([note['duration'] for note in notes], dtype=np.float64),
+            np.array([note['velocity'] for note in notes], dtype=np.int16)
+        )
+
+    def __len__(self) -> int:
+        return len(self.pitch)
+
+    def __getitem__(self, index: int) -> Dict:
+        return {
+            'pitch': int(self.pitch[index]),
+            'start_time': float(self.start_time[index]),
+            'duration': float(self.duration[index]),
+            'velocity': int(self.velocity[index])
+        }
+
+    def __iter__(self):
+        return iter(self.to_dicts())
+
+    def to_dicts(self) -> List[Dict]:
+        """Convert to a list of note dictionaries."""
+        return [
+            {
+                'pitch': pitch,
+                'start_time': start_time,
+                'duration': duration,
+                'velocity': velocity
+            }
+            for pitch, start_time, duration, velocity in zip(
+                self.pitch.tolist(),
+                self.start_time.tolist(),
+                self.duration.tolist(),
+                self.velocity.tolist()
+            )
+        ]
+
+
+class TorchaudioDemucsSeparator:
+    """
+    In-process Hybrid Demucs separator built on torchaudio's pretrained pipeline.
+    
+    The model is loaded once per device and shared by every instance, so
+    repeated separations only pay for inference rather than model loading.
+    """
+
+    _model_cache = {}
+
+    def __init__(self, device: Optional[str] = None, segment: float = 10.0,
+                 overlap: float = 0.1, gc_every: int = 16):
+        """
+        Load (or reuse) the Hybrid Demucs model.
+        
+        Args:
+            device: Torch device to run on; defaults to CUDA when available
+            segment: Length in seconds of the windows long inputs are split into
+            overlap: Length in seconds of the crossfade between windows
+            gc_every: Release cached allocator memory after this many separations
+        """
+        import torch
+        from torchaudio.pipelines import HDEMUCS_HIGH_MUSDB_PLUS as bundle
+
+        self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+        self.sample_rate = bundle.sample_rate
+        self.segment = segment
+        self.overlap = overlap
+        self.gc_every = gc_every
+        self._separations = 0
+
+        if self.device not in self._model_cache:
+            self._model_cache[self.device] = bundle.get_model().to(self.device).eval()
+        self.model = self._model_cache[self.device]
+
+    def separate(self, wav_path: str, sample_rate: int) -> Dict[str, np.ndarray]:
+        """
+        Separate a WAV file into mono stems.
+        
+        Args:
+            wav_path: Path to input WAV file
+            sample_rate: Sample rate of the returned stems
+            
+        Returns:
+            Dictionary with stem names as keys and audio data as values
+        """
+        import torch
+        import torchaudio.functional as F
+
+        audio = np.atleast_2d(_load_audio(wav_path, self.sample_rate, mono=False))
+        if audio.shape[0] == 1:
+            # Demucs expects stereo input
+            audio = np.repeat(audio, 2, axis=0)
+
+        # One upload of the mix and one download of the finished stems: the
+        # downmix and resampling run on the device before the copy back, so
+        # only mono audio at the output rate leaves it
+        with torch.inference_mode():
+            waveform = torch.from_numpy(audio).to(self.device)
+            ref = waveform.mean(dim=0)
+            mean, std = ref.mean(), ref.std()
+            mono_sources = self._separate_windows((waveform - mean) / std) * std + mean
+            if sample_rate != self.sample_rate:
+                mono_sources = F.resample(mono_sources, self.sample_rate, sample_rate)
+            mono_sources = mono_sources.to(torch.float32).cpu().numpy()
+
+        stems = dict(zip(self.model.sources, mono_sources))
+
+        # Inputs differ in length from file to file, which fragments the
+        # allocator's cached blocks over long batches; trim them periodically
+        self._separations += 1
+        if self._separations >= self.gc_every:
+            self._separations = 0
+            gc.collect()
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        return stems
+
+    def _separate_windows(self, waveform: "torch.Tensor") -> "torch.Tensor":
+        """
+        Run the model over overlapping windows and crossfade the results.
+        
+        Bounding the window length bounds peak memory, so long inputs do not
+        need a single allocation proportional to the whole track.
+        
+        Args:
+            waveform: Normalized (channels, samples) input on the model device
+            
+        Returns:
+            Mono (sources, samples) output
+        """
+        import torch
+
+        length = waveform.shape[-1]
+        segment = int(self.segment * self.sample_rate)
+        overlap = int(self.overlap * self.sample_rate)
+        if length <= segment + overlap:
+            return self.model(waveform.unsqueeze(0))[0].mean(dim=1)
+
+        output = torch.zeros(len(self.model.sources), length, device=waveform.device)
+        fade_in = torch.linspace(0.0, 1.0, overlap + 2, device=waveform.device)[1:-1]
+        start = 0
+        while True:
+            end = min(start + segment + overlap, length)
+            sources = self.model(waveform[:, start:end].unsqueeze(0))[0].mean(dim=1)
+            # Linear crossfade: each window fades in over the previous window's fade out
+            if start > 0:
+                sources[:, :overlap] *= fade_in
+            if end < length:
+                sources[:, -overlap:] *= 1.0 - fade_in
+            output[:, start:end] += sources
+            if end == length:
+                return output
+            start += segment
+
+    @classmethod
+    def close(cls):
+        """Release every cached model and any GPU memory it held."""
+        cls._model_cache.clear()
+        try:
+            import torch
+        except ImportError:
+            return
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+
 class WaveToMIDIConverter:
     """
     Convert WAV files to MIDI by first separating into stems and then
     converting each stem to MIDI using pitch detection.
     """
     
-    def __init__(self, config: Optional[Dict] = None):
+    # Demucs model producing each supported number of stems
+    _STEM_TO_MODEL = {
+        4: "htdemucs",
+        6: "htdemucs_6s",
+    }
+    # Seconds of context added on each side of a pitch tracking tile
+    _TILE_OVERLAP = 1.0
+    
+    def __init__(self, config: Union[Dict, str, None] = None):
         """
-        Initialize the converter with an optional configuration dictionary.
+        Initialize the converter with an optional configuration.
         
         Args:
-            config: Dictionary with configuration parameters
+            config: Dictionary with configuration parameters, or path to a
+                JSON configuration file
         """
         # Default configuration
         self.config = {
-            "stem_count": 5,
-            "sample_rate": 22050,
-            "model_type": "spleeter:5stems",
+            "stem_count": 4,
+            "sample_rate": 11025,
+            "separation_backend": "demucs",
+            "demucs_device": None,  # None picks cuda when available, else cpu
+            "demucs_jobs": None,  # Parallel jobs for demucs on the CPU; None runs a single job
+            "stem_cache_dir": None,  # Directory to cache demucs stems in; None disables the cache
+            "separation_segment": 10.0,  # Seconds per window for the torchaudio backend
+            "gc_every": 16,
             "pitch_detection_method": "pyin",
-            "frame_length": 2048,
-            "hop_length": 512,
+            "periodicity_threshold": 0.6,
+            "crepe_model": "tiny",  # "tiny" or "full" torchcrepe network
+            "frame_length": 1024,  # Samples at sample_rate, for both pitch trackers
+            "hop_length": 256,
             "fmin": 27.5,  # A0
             "fmax": 4186.01,  # C8
+            "pyin_downsample": True,
+            "pyin_resolution": 1.0,  # pYIN pitch bin width in semitones, relative to fmin
+            "stem_workers": None,  # Processes for pYIN; None uses one per CPU
+            "pyin_tile_seconds": 10.0,  # Length of the tiles stems are split into across processes
             "probability_threshold": 0.5,
+            "silence_threshold": 1e-3,
+            "skip_stems": ["drums"],
             "min_note_duration": 0.1,
             "max_note_duration": 2.0,
             "velocity_scaling": 1.0,
             "output_bpm": 120,
+            "fast_midi_writer": True,  # False builds the file with mido instead
             "instrument_mapping": {
                 "vocals": 5,    # Voice
                 "drums": 0,     # Acoustic Grand Piano (for percussion)
                 "bass": 33,     # Electric Bass (finger)
-                "other": 40     # String Ensemble 1
+                "other": 40,    # String Ensemble 1
+                "guitar": 25,   # Acoustic Guitar (steel)
+                "piano": 0      # Acoustic Grand Piano
             }
         }
         
         # Load configuration if provided
+        if isinstance(config, str):
+            with open(config, 'r') as f:
+                config = json.load(f)
         if config:
             self.config.update(config)
         
-        # Set stem model based on stem count
-        if self.config["stem_count"] == 2:
-            self.config["model_type"] = "spleeter:2stems"
-        elif self.config["stem_count"] == 4:
-            self.config["model_type"] = "spleeter:4stems"
-        elif self.config["stem_count"] == 5:
-            self.config["model_type"] = "spleeter:5stems"
+        # Set stem model based on stem count, unless a model was given explicitly
+        if self.config["stem_count"] not in self._STEM_TO_MODEL:
+            raise ValueError(
+                f"Unsupported stem count: {self.config['stem_count']}. "
+                f"Expected one of {', '.join(str(n) for n in self._STEM_TO_MODEL)}"
+            )
+        self.config.setdefault("model_type", self._STEM_TO_MODEL[self.config["stem_count"]])
         
-        self.audio_adapter = None
-        self.separator = None
+        if self.config["separation_backend"] not in SEPARATION_BACKENDS:
+            raise ValueError(
+                f"Unknown separation backend: {self.config['separation_backend']}. "
+                f"Expected one of {', '.join(SEPARATION_BACKENDS)}"
+            )
+        if self.config["separation_backend"] == "torchaudio" and self.config["stem_count"] != 4:
+            raise ValueError("The torchaudio separation backend only produces 4 stems")
+        if self.config["pitch_detection_method"] not in PITCH_DETECTION_METHODS:
+            raise ValueError(
+                f"Unknown pitch detection method: {self.config['pitch_detection_method']}. "
+                f"Expected one of {', '.join(PITCH_DETECTION_METHODS)}"
+            )
+        if self.config["pitch_detection_method"] == "auto":
+            self.config["pitch_detection_method"] = self._auto_pitch_detection_method()
     
+    @staticmethod
+    def _auto_pitch_detection_method() -> str:
+        """
+        Pick the pitch tracker for the "auto" method.
+        
+        Returns:
+            "torchcrepe" if it is installed and a CUDA GPU is available,
+            otherwise "pyin"
+        """
+        if importlib.util.find_spec("torchcrepe") is None:
+            return "pyin"
+        import torch
+        return "torchcrepe" if torch.cuda.is_available() else "pyin"
+    
+    @cached_property
+    def separator(self) -> "TorchaudioDemucsSeparator":
+        """In-process separator, loaded on first use so unused models cost nothing."""
+        return TorchaudioDemucsSeparator(
+            segment=self.config["separation_segment"],
+            gc_every=self.config["gc_every"]
+        )
+    
+    def close(self):
+        """Release the in-process separation model, if one was loaded."""
+        self.__dict__.pop("separator", None)
+        TorchaudioDemucsSeparator.close()
+
     def separate_stems(self, wav_path: str) -> Dict[str, np.ndarray]:
         """
-        Separate the input WAV file into stems using the demucs command-line tool.
+        Separate the input WAV file into stems using the configured backend.
+        
+        The "demucs" backend runs the demucs command-line tool, while the
+        "torchaudio" backend keeps a Hybrid Demucs model loaded in-process.
         
         Args:
             wav_path: Path to input WAV file
@@ -79,44 +535,211 @@ class WaveToMIDIConverter:
         Returns:
             Dictionary with stem names as keys and audio data as values
         """
-        if not shutil.which('demucs'):
-            raise RuntimeError("demucs command not found. Please make sure it is installed and in your PATH.")
+        if self.config["separation_backend"] == "torchaudio":
+            return self.separator.separate(str(wav_path), self.config["sample_rate"])
+
+        # Closing the generator stops demucs before its directory is removed
+        with tempfile.TemporaryDirectory() as temp_dir, \
+                closing(self._separate_demucs([wav_path], temp_dir)) as output_bases:
+            output_base, = output_bases
+            return self._load_stems(output_base)
+
+    def _separate_demucs(self, wav_paths: List[str], temp_dir: str) -> Iterator[Path]:
+        """
+        Get demucs stem directories for WAV files, using the stem cache when enabled.
+        
+        Stems are cached under stem_cache_dir, keyed by a hash of the input
+        file's contents and the demucs model name, so repeated conversions of
+        the same audio skip separation. Demucs runs once for all cache misses.
+        
+        Args:
+            wav_paths: Paths to input WAV files
+            temp_dir: Working directory for the demucs output
+            
+        Yields:
+            Stem output directory for each file, in the same order as wav_paths
+        """
+        if not self.config.get("stem_cache_dir"):
+            yield from self._run_demucs(wav_paths, temp_dir)
+            return
+
+        cache_bases = [self._stem_cache_path(wav_path) for wav_path in wav_paths]
+        misses = []
+        for i, (wav_path, cache_base) in enumerate(zip(wav_paths, cache_bases)):
+            if cache_base.is_dir():
+                print(f"Using cached stems for {wav_path}")
+            else:
+                misses.append(i)
 
-        with tempfile.TemporaryDirectory() as temp_dir:
-            # Note: demucs requires the input path to be absolute if cwd is changed.
-            absolute_wav_path = str(Path(wav_path).absolute())
-            cmd = ['demucs', absolute_wav_path]
+        # Start demucs before handing out any cached stems, so it separates
+        # the misses while the caller converts the hits
+        output_bases = iter(self._run_demucs([wav_paths[i] for i in misses], temp_dir) if misses else ())
+        try:
+            for i, cache_base in enumerate(cache_bases):
+                if i in misses:
+                    output_base = next(output_bases)
+                    if not cache_base.is_dir():
+                        # Copy next to the final path and rename it into place, so
+                        # an interrupted copy is never mistaken for a cache hit
+                        partial = cache_base.with_name(cache_base.name + '.partial')
+                        shutil.rmtree(partial, ignore_errors=True)
+                        shutil.copytree(output_base, partial)
+                        os.replace(partial, cache_base)
+                    # Otherwise another input in this batch had the same contents
+                yield cache_base
+        finally:
+            # Stop demucs if this generator is closed before it finished
+            if hasattr(output_bases, 'close'):
+                output_bases.close()
 
-            print(f"Running demucs on {wav_path}...")
-            try:
-                # Run demucs with the CWD set to the temporary directory
-                subprocess.run(cmd, check=True, cwd=temp_dir, capture_output=True, text=True)
-            except subprocess.CalledProcessError as e:
-                raise RuntimeError(f"Demucs failed with error: {e.stderr}")
+    def _stem_cache_path(self, wav_path: str) -> Path:
+        """
+        Get the stem cache directory for a WAV file.
+        
+        Args:
+            wav_path: Path to input WAV file
+            
+        Returns:
+            Cache directory named after the file's SHA-256 and the demucs model
+        """
+        with open(wav_path, 'rb') as f:
+            if hasattr(hashlib, 'file_digest'):
+                digest = hashlib.file_digest(f, 'sha256')
+            else:
+                digest = hashlib.sha256()
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(block)
+        key = digest.hexdigest()[:16]
+        cache_dir = Path(self.config["stem_cache_dir"]).expanduser()
+        return cache_dir / f"{key}_{self.config['model_type']}"
 
-            # Now, read the stems from the output directory inside the temp dir
-            stems = {}
-            stem_names = ['vocals', 'drums', 'bass', 'other']
+    def _run_demucs(self, wav_paths: List[str], temp_dir: str) -> Iterator[Path]:
+        """
+        Start a single demucs process over one or more WAV files.
+        
+        Demucs loads its model once per process, so passing every file in one
+        invocation avoids paying the model load cost for each file. Demucs is
+        started before this returns, and each file's stems are handed out as
+        soon as they are saved, so the caller can convert them while demucs
+        separates the remaining files.
+        
+        Args:
+            wav_paths: Paths to input WAV files
+            temp_dir: Working directory for the demucs output
+            
+        Returns:
+            Iterator over the stem output directories, in the same order as wav_paths
+        """
+        if not shutil.which('demucs'):
+            raise RuntimeError("demucs command not found. Please make sure it is installed and in your PATH.")
 
-            # Default output path structure is separated/<model_name>/<track_name>
-            track_name = Path(wav_path).stem
-            model_name = 'htdemucs'  # This is the default model for demucs v4
+        # Note: demucs requires the input path to be absolute if cwd is changed.
+        absolute_wav_paths = [str(Path(wav_path).absolute()) for wav_path in wav_paths]
+        model_name = self.config["model_type"]
+        device = self.config.get("demucs_device") or self._demucs_device()
+        cmd = ['demucs', '-n', model_name, '-d', device]
+        # Every demucs job loads its own model copy and torch thread pool, and
+        # demucs already runs alongside the pYIN workers, so jobs are opt-in
+        if device == 'cpu' and self.config.get("demucs_jobs"):
+            cmd += ['-j', str(self.config["demucs_jobs"])]
+        cmd += absolute_wav_paths
 
-            output_base = Path(temp_dir) / 'separated' / model_name / track_name
+        # Default output path structure is separated/<model_name>/<track_name>
+        output_bases = [Path(temp_dir) / 'separated' / model_name / Path(wav_path).stem for wav_path in wav_paths]
 
+        print(f"Running demucs on {', '.join(str(p) for p in wav_paths)}...")
+        # stderr carries demucs' progress bars, so it goes to a file rather than
+        # a pipe that could fill up while the caller is busy with earlier stems.
+        # stdout is unbuffered so progress lines arrive as they are printed.
+        log = tempfile.TemporaryFile('w+')
+        process = subprocess.Popen(
+            cmd, cwd=temp_dir, stdout=subprocess.PIPE, stderr=log, text=True,
+            env=dict(os.environ, PYTHONUNBUFFERED='1')
+        )
+        return self._demucs_outputs(process, log, output_bases)
+
+    @staticmethod
+    def _demucs_outputs(process: subprocess.Popen, log: IO[str], output_bases: List[Path]) -> Iterator[Path]:
+        """
+        Yield each track's stem directory as soon as demucs has saved it.
+        
+        Demucs prints "Separating track ..." before each track and saves every
+        stem of a track before starting the next one, so a track is complete
+        once the following one starts, and the last once the process exits.
+        
+        Args:
+            process: Running demucs process with stdout piped
+            log: File receiving the process's stderr
+            output_bases: Expected stem output directory of each track, in order
+            
+        Yields:
+            Stem output directories, in order
+        """
+        def finished(output_base: Path) -> Path:
             if not output_base.exists():
                 raise RuntimeError(f"Demucs did not produce the expected output directory: {output_base}")
+            return output_base
 
-            for stem_name in stem_names:
-                stem_path = output_base / f"{stem_name}.wav"
-                if stem_path.exists():
-                    print(f"Loading {stem_name} stem...")
-                    audio, sr = librosa.load(str(stem_path), sr=self.config['sample_rate'], mono=True)
-                    stems[stem_name] = audio
+        try:
+            done = 0
+            started = 0
+            for line in process.stdout:
+                if line.startswith("Separating track"):
+                    started += 1
+                    while done < min(started - 1, len(output_bases)):
+                        yield finished(output_bases[done])
+                        done += 1
 
-            return stems
+            if process.wait() != 0:
+                log.seek(0)
+                raise RuntimeError(f"Demucs failed with error: {log.read()}")
+            for output_base in output_bases[done:]:
+                yield finished(output_base)
+        finally:
+            # Stop demucs if the caller gave up before it finished
+            if process.poll() is None:
+                process.kill()
+            process.stdout.close()
+            process.wait()
+            log.close()
+
+    @staticmethod
+    def _demucs_device() -> str:
+        """
+        Pick the device demucs should run on.
+        
+        Returns:
+            "cuda" if a CUDA GPU is available, otherwise "cpu"
+        """
+        try:
+            import torch
+        except ImportError:
+            # demucs brings its own torch, so fall back to looking for a driver
+            return 'cuda' if shutil.which('nvidia-smi') else 'cpu'
+        return 'cuda' if torch.cuda.is_available() else 'cpu'
+
+    def _load_stems(self, output_base: Path) -> Dict[str, np.ndarray]:
+        """
+        Load the stems written by demucs for a single track.
+        
+        Args:
+            output_base: Demucs output directory for the track
+            
+        Returns:
+            Dictionary with stem names as keys and audio data as values
+        """
+        stems = {}
+        stem_names = ['vocals', 'drums', 'bass', 'other', 'guitar', 'piano']
+
+        for stem_name in stem_names:
+            stem_path = output_base / f"{stem_name}.wav"
+            if stem_path.exists():
+                print(f"Loading {stem_name} stem...")
+                stems[stem_name] = _load_audio(str(stem_path), self.config['sample_rate'])
+
+        return stems
     
-    def detect_notes(self, audio: np.ndarray, sample_rate: int) -> List[Dict]:
+    def detect_notes(self, audio: np.ndarray, sample_rate: int) -> NoteArray:
         """
         Detect notes in audio signal using pitch detection.
         
@@ -125,95 +748,243 @@ class WaveToMIDIConverter:
             sample_rate: Sample rate of audio
             
         Returns:
-            List of detected notes with pitch, start_time, duration, and velocity
+            Detected notes with pitch, start_time, duration, and velocity
+        """
+        if self._is_silent(audio):
+            return NoteArray.empty()
+        
+        f0, voiced_flag, voiced_probs, hop_time = self._track_pitch(audio, sample_rate)
+        return self._notes_from_pitch(f0, voiced_flag, voiced_probs, hop_time)
+    
+    def detect_notes_batch(self, stems: Dict[str, np.ndarray], sample_rate: int) -> Dict[str, NoteArray]:
+        """
+        Detect notes in several signals with a single pitch tracking call.
+        
+        Signals are zero-padded to a common length and stacked along a leading
+        axis, so pYIN's per-call setup is paid once; torchcrepe tracks the
+        rows one at a time. Silent signals are skipped without running pitch
+        detection.
+        
+        Args:
+            stems: Dictionary with stem names as keys and audio data as values
+            sample_rate: Sample rate of audio
+            
+        Returns:
+            Dictionary with stem names as keys and detected notes as values
+        """
+        notes = {stem_name: NoteArray.empty() for stem_name in stems}
+        active = {
+            stem_name: audio for stem_name, audio in stems.items()
+            if not self._is_silent(audio)
+        }
+        if not active:
+            return notes
+        
+        batch = np.zeros((len(active), max(len(audio) for audio in active.values())), dtype=np.float32)
+        for row, audio in zip(batch, active.values()):
+            row[:len(audio)] = audio
+        
+        f0, voiced_flag, voiced_probs, hop_time = self._track_pitch(batch, sample_rate)
+        hop_length = round(hop_time * sample_rate)
+        for i, (stem_name, audio) in enumerate(active.items()):
+            # Drop the frames that only cover another stem's padding
+            n_frames = 1 + len(audio) // hop_length
+            notes[stem_name] = self._notes_from_pitch(
+                f0[i, :n_frames], voiced_flag[i, :n_frames], voiced_probs[i, :n_frames], hop_time
+            )
+        return notes
+    
+    def _is_silent(self, audio: np.ndarray) -> bool:
+        """
+        Check whether a signal is too quiet to contain notes.
+        
+        This is a single O(N) pass, far cheaper than running pitch detection
+        over a silent stem.
+        
+        Args:
+            audio: Audio signal
+            
+        Returns:
+            True if the peak or RMS level is below silence_threshold
+        """
+        if audio.size == 0:
+            return True
+        threshold = self.config.get("silence_threshold", 1e-3)
+        if np.max(np.abs(audio)) < threshold:
+            return True
+        return bool(np.sqrt(np.mean(np.square(audio, dtype=np.float64))) < threshold)
+    
+    def _notes_from_pitch(self, f0: np.ndarray, voiced_flag: np.ndarray, voiced_probs: np.ndarray,
+                          hop_time: float) -> NoteArray:
+        """
+        Turn per-frame pitch estimates into notes.
+        
+        Args:
+            f0: Fundamental frequency of each frame in Hz
+            voiced_flag: Whether each frame is voiced
+            voiced_probs: Voicing probability of each frame
+            hop_time: Time in seconds between consecutive frames
+            
+        Returns:
+            Detected notes with pitch, start_time, duration, and velocity
+        """
+        # Keep only confidently voiced frames; the f0 > 0 test also rejects NaN
+        voiced = voiced_flag & (voiced_probs > self.config["probability_threshold"]) & (f0 > 0)
+        frames = np.nonzero(voiced)[0]
+        if frames.size == 0:
+            return NoteArray.empty()
+        
+        # Convert frequency to MIDI notes with the closed form of librosa.hz_to_midi,
+        # 12 * log2(f / 440) + 69, with the reference folded into one offset.
+        # Gather the voiced frames once by index, then work in place so the
+        # conversion allocates nothing beyond the gathered arrays
+        midi_pitches = f0.take(frames)
+        np.log2(midi_pitches, out=midi_pitches)
+        midi_pitches *= 12.0
+        midi_pitches += _MIDI_PITCH_OFFSET
+        pitches = np.rint(midi_pitches, out=midi_pitches).astype(np.int16)
+        
+        velocities = voiced_probs.take(frames)
+        velocities *= 127 * self.config["velocity_scaling"]
+        np.clip(velocities, 1, 127, out=velocities)
+        
+        # Group frames into sustained notes
+        return NoteArray(*_group_notes(
+            frames, pitches, velocities, hop_time,
+            self.config["min_note_duration"], self.config["max_note_duration"]
+        ))
+    
+    def _track_pitch(self, audio: np.ndarray, sample_rate: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, float]:
+        """
+        Estimate the per-frame fundamental frequency with the configured method.
+        
+        Args:
+            audio: Audio signal, optionally with leading batch axes
+            sample_rate: Sample rate of audio
+            
+        Returns:
+            Tuple of (f0, voiced_flag, voiced_probs, hop_time), where the arrays
+            are shaped like audio with frames on the last axis and hop_time
+            is the time in seconds between consecutive frames
         """
-        # Use pYIN for pitch detection
-        f0, voiced_flag, voiced_probs = librosa.pyin(
-            audio,
-            fmin=self.config["fmin"],
-            fmax=self.config["fmax"],
+        # librosa keeps the input dtype, so float32 input halves the memory
+        # traffic of pYIN's framing and difference-function passes
+        audio = np.ascontiguousarray(audio, dtype=np.float32)
+        
+        if self.config["pitch_detection_method"] == "torchcrepe":
+            return self._track_pitch_torchcrepe(audio, sample_rate)
+        return self._track_pitch_pyin(audio, sample_rate)
+    
+    def _track_pitch_pyin(self, audio: np.ndarray, sample_rate: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, float]:
+        """Estimate pitch on the CPU with librosa's pYIN."""
+        import librosa
+        
+        # pYIN only needs a little above 2 * fmax of bandwidth, so decimate by
+        # the largest integer factor that keeps it. frame_length and hop_length
+        # are in samples at the input rate, as for torchcrepe, and are scaled
+        # down with the audio so frame timestamps are unchanged
+        factor = self._pyin_decimation(sample_rate)
+        frame_length = self.config["frame_length"] // factor
+        hop_length = self.config["hop_length"] // factor
+        if factor > 1:
+            audio = librosa.resample(audio, orig_sr=sample_rate, target_sr=sample_rate // factor,
+                                     res_type='polyphase')
+            sample_rate //= factor
+        
+        # pYIN's Viterbi decode is quadratic in the number of pitch bins, and the
+        # notes are rounded to semitones anyway, so semitone bins shrink the
+        # transition matrix 100x compared to librosa's 0.1 semitone default
+        # without changing notes. Bins are measured from fmin, so fmin is
+        # snapped to the nearest MIDI note to keep them on the note grid
+        fmin_pitch = np.rint(12.0 * np.log2(self.config["fmin"]) + _MIDI_PITCH_OFFSET)
+        # Audio supplied below the configured rate can leave fmax above Nyquist
+        pyin_kwargs = dict(
+            fmin=2.0 ** ((fmin_pitch - _MIDI_PITCH_OFFSET) / 12.0),
+            fmax=min(self.config["fmax"], sample_rate / 2.2),
             sr=sample_rate,
-            frame_length=self.config["frame_length"],
-            hop_length=self.config["hop_length"]
+            frame_length=frame_length,
+            hop_length=hop_length,
+            resolution=self.config.get("pyin_resolution", 1.0)
         )
         
-        # Convert frequency to MIDI notes
-        midi_notes = []
-        for i, (f, voiced, prob) in enumerate(zip(f0, voiced_flag, voiced_probs)):
-            if voiced and prob > self.config["probability_threshold"] and f is not None:
-                midi_pitch = int(round(librosa.hz_to_midi(f)))
-                time = i * self.config["hop_length"] / sample_rate
-                velocity = int(min(127, max(1, prob * 127 * self.config["velocity_scaling"])))
-                
-                midi_notes.append({
-                    'pitch': midi_pitch,
-                    'time': time,
-                    'velocity': velocity,
-                    'probability': prob
-                })
-        
-        # Group notes into sustained notes
-        final_notes = []
-        active_notes = {}
-        
-        for note in midi_notes:
-            pitch = note['pitch']
-            time = note['time']
-            velocity = note['velocity']
+        f0, voiced_flag, voiced_probs = librosa.pyin(audio, **pyin_kwargs)
+        return f0, voiced_flag, voiced_probs, hop_length / sample_rate
+    
+    def _track_pitch_torchcrepe(self, audio: np.ndarray, sample_rate: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, float]:
+        """
+        Estimate pitch with the CREPE network via torchcrepe, on the GPU when available.
+        
+        CREPE's periodicity stands in for pYIN's voicing probability; frames
+        above periodicity_threshold are treated as voiced.
+        """
+        import torch
+        import torchcrepe
+        
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        # torchcrepe.predict only takes a single (1, samples) signal, so a
+        # batch of signals is tracked one row at a time
+        f0_rows, periodicity_rows = [], []
+        for row in audio.reshape(-1, audio.shape[-1]):
+            f0, periodicity = torchcrepe.predict(
+                torch.as_tensor(row[np.newaxis], dtype=torch.float32, device=device),
+                sample_rate,
+                self.config["hop_length"],
+                self.config["fmin"],
+                self.config["fmax"],
+                model=self.config.get("crepe_model", "tiny"),
+                batch_size=2048,
+                device=device,
+                return_periodicity=True
+            )
+            f0_rows.append(f0[0].cpu().numpy())
+            periodicity_rows.append(periodicity[0].cpu().numpy())
+        f0 = np.stack(f0_rows).reshape(audio.shape[:-1] + (-1,))
+        periodicity = np.stack(periodicity_rows).reshape(audio.shape[:-1] + (-1,))
+        voiced_flag = periodicity > self.config["periodicity_threshold"]
+        # torchcrepe resamples to 16 kHz and truncates the hop to whole samples
+        # at that rate, so frames are spaced by that hop rather than the configured one
+        crepe_hop = int(self.config["hop_length"] * torchcrepe.SAMPLE_RATE / sample_rate)
+        return f0, voiced_flag, periodicity, crepe_hop / torchcrepe.SAMPLE_RATE
+    
+    def _pyin_decimation(self, sample_rate: int) -> int:
+        """
+        Choose the integer factor to decimate audio by before pYIN.
+        
+        The factor keeps the reduced rate at or above 2.2 * fmax and divides
+        the sample rate, frame length and hop length exactly, so frame
+        timestamps are unchanged.
+        
+        Args:
+            sample_rate: Sample rate of audio
             
-            if pitch not in active_notes:
-                # Start new note
-                active_notes[pitch] = {
-                    'start_time': time,
-                    'velocity': velocity
-                }
-            else:
-                # Check if current note is significantly different in velocity
-                # or if too much time has passed (gap in playing)
-                time_diff = time - active_notes[pitch]['start_time']
-                if time_diff > self.config["max_note_duration"]:
-                    # End the previous note and start a new one
-                    duration = min(time_diff, self.config["max_note_duration"])
-                    if duration >= self.config["min_note_duration"]:
-                        final_notes.append({
-                            'pitch': pitch,
-                            'start_time': active_notes[pitch]['start_time'],
-                            'duration': duration,
-                            'velocity': active_notes[pitch]['velocity']
-                        })
-                    # Start new note
-                    active_notes[pitch] = {
-                        'start_time': time,
-                        'velocity': velocity
-                    }
-        
-        # End any remaining active notes
-        current_time = len(audio) / sample_rate
-        for pitch, note_info in active_notes.items():
-            duration = current_time - note_info['start_time']
-            if duration >= self.config["min_note_duration"]:
-                final_notes.append({
-                    'pitch': pitch,
-                    'start_time': note_info['start_time'],
-                    'duration': min(duration, self.config["max_note_duration"]),
-                    'velocity': note_info['velocity']
-                })
-        
-        return final_notes
-    
-    def notes_to_midi(self, notes: List[Dict], instrument: str, tempo: int = 120) -> MidiFile:
+        Returns:
+            Decimation factor, 1 when the audio should not be resampled
+        """
+        if not self.config.get("pyin_downsample", True):
+            return 1
+        
+        factor = int(sample_rate // (2.2 * self.config["fmax"]))
+        while factor > 1 and (sample_rate % factor or self.config["frame_length"] % factor
+                              or self.config["hop_length"] % factor):
+            factor -= 1
+        return max(factor, 1)
+    
+    def notes_to_midi(self, notes: Union[NoteArray, List[Dict]], instrument: str, tempo: int = 120) -> "mido.MidiFile":
         """
         Convert detected notes to MIDI file.
         
         Args:
-            notes: List of detected notes
+            notes: Detected notes, as a NoteArray or a list of note dictionaries
             instrument: Instrument name for program change
             tempo: Tempo in BPM
             
         Returns:
             MIDI file object
         """
-        midi = MidiFile()
+        import mido
+        from mido import MidiFile, MidiTrack, Message
+        
+        midi = MidiFile(ticks_per_beat=TICKS_PER_BEAT)
         track = MidiTrack()
         midi.tracks.append(track)
         
@@ -225,99 +996,334 @@ class WaveToMIDIConverter:
         program = self.config["instrument_mapping"].get(instrument, 0)
         track.append(Message('program_change', channel=0, program=program))
         
-        # Sort notes by start time
-        notes.sort(key=lambda x: x['start_time'])
+        # Create note on/off messages
+        for status, pitch, velocity, delta_tick in zip(*self._note_events(notes, microseconds_per_beat)):
+            message_type = 'note_on' if status == NOTE_ON else 'note_off'
+            track.append(Message(message_type, note=pitch, velocity=velocity, time=delta_tick))
         
-        # Current time in ticks
-        current_tick = 0
+        return midi
+    
+    def notes_to_midi_bytes(self, notes: Union[NoteArray, List[Dict]], instrument: str, tempo: int = 120) -> bytes:
+        """
+        Encode detected notes directly as a Standard MIDI File.
         
-        # Create note on/off messages
-        for note in notes:
-            # Calculate ticks for start time
-            start_tick = int(mido.second2tick(
-                note['start_time'],
-                midi.ticks_per_beat,
-                microseconds_per_beat
-            ))
-
-            # Calculate ticks for duration
-            duration_tick = int(mido.second2tick(
-                note['duration'],
-                midi.ticks_per_beat,
-                microseconds_per_beat
-            ))
-            
-            # Add wait time if needed
-            wait_tick = start_tick - current_tick
-            if wait_tick > 0:
-                track.append(Message('note_on', note=0, velocity=0, time=wait_tick))
-            
-            # Note on
-            track.append(Message('note_on', note=note['pitch'], 
-                               velocity=note['velocity'], time=0))
+        Produces the same bytes as saving the result of notes_to_midi, but
+        writes events straight into a buffer instead of building a mido
+        Message object for each one.
+        
+        Args:
+            notes: Detected notes, as a NoteArray or a list of note dictionaries
+            instrument: Instrument name for program change
+            tempo: Tempo in BPM
             
-            # Note off
-            track.append(Message('note_off', note=note['pitch'], 
-                               velocity=0, time=duration_tick))
+        Returns:
+            Contents of a type 1 MIDI file with a single track
+        """
+        # Same rounding as mido.bpm2tempo, without importing mido
+        microseconds_per_beat = int(round(60_000_000 / tempo))
+        program = self.config["instrument_mapping"].get(instrument, 0)
+        
+        track = bytearray()
+        track += b'\x00\xff\x51\x03' + microseconds_per_beat.to_bytes(3, 'big')
+        track += bytes((0x00, 0xC0, program))
+        
+        # Channel messages use running status, like mido's writer
+        status = 0xC0
+        for event_status, pitch, velocity, delta_tick in zip(*self._note_events(notes, microseconds_per_beat)):
+            _write_vlq(track, delta_tick)
+            if status != event_status:
+                track.append(event_status)
+                status = event_status
+            track.append(pitch)
+            track.append(velocity)
+        
+        # End of track
+        track += b'\x00\xff\x2f\x00'
+        
+        header = b'MThd' + struct.pack('>IHHH', 6, 1, 1, TICKS_PER_BEAT)
+        return header + b'MTrk' + struct.pack('>I', len(track)) + bytes(track)
+    
+    def _note_events(self, notes: Union[NoteArray, List[Dict]],
+                     microseconds_per_beat: int) -> Tuple[List[int], List[int], List[int], List[int]]:
+        """
+        Flatten notes into note on/off events in time order, with delta times in ticks.
+        
+        Args:
+            notes: Detected notes, as a NoteArray or a list of note dictionaries
+            microseconds_per_beat: Tempo of the MIDI file
             
-            current_tick = start_tick + duration_tick
+        Returns:
+            Tuple of (statuses, pitches, velocities, delta_ticks), one element
+            per event, where statuses are NOTE_ON or NOTE_OFF status bytes and
+            delta_ticks is the time since the previous event
+        """
+        if not isinstance(notes, NoteArray):
+            notes = NoteArray.from_dicts(notes)
         
-        return midi
+        # Convert times to ticks in one pass; the tempo is constant, so this is a
+        # single scale factor rather than a mido.second2tick call per value.
+        # Start and end times are both rounded from absolute time, so a
+        # note_off lands on the tick nearest its true end rather than carrying
+        # the rounding error of the note's start
+        ticks_per_second = TICKS_PER_BEAT * 1_000_000.0 / microseconds_per_beat
+        times = np.stack((notes.start_time, notes.start_time + notes.duration))
+        times *= ticks_per_second
+        start_ticks, end_ticks = np.rint(times, out=times).astype(np.int64)
+        # A note must outlast its own note_on, which sorts after note_offs
+        np.maximum(end_ticks, start_ticks + 1, out=end_ticks)
+        
+        # Note offs come first, so a stable sort puts a note_off before any
+        # note_on at the same tick and keeps each kind in note order
+        n = len(notes)
+        ticks = np.concatenate((end_ticks, start_ticks))
+        order = np.argsort(ticks, kind='stable')
+        statuses = np.repeat(np.array([NOTE_OFF, NOTE_ON]), n)[order]
+        pitches = np.tile(notes.pitch, 2)[order]
+        velocities = np.concatenate((np.zeros(n, dtype=notes.velocity.dtype), notes.velocity))[order]
+        delta_ticks = np.diff(ticks[order], prepend=0)
+        return statuses.tolist(), pitches.tolist(), velocities.tolist(), delta_ticks.tolist()
     
-    def convert(self, wav_path: str, output_dir: str) -> List[str]:
+    def convert(self, wav_path: Union[str, List[str]], output_dir: str) -> List[str]:
         """
-        Convert a WAV file to multiple MIDI files by separating into stems.
+        Convert one or more WAV files to multiple MIDI files by separating into stems.
+        
+        When several files are given with the demucs backend they are
+        separated by a single demucs run, so the separation model is only
+        loaded once for the whole batch.
         
         Args:
-            wav_path: Path to input WAV file
+            wav_path: Path to input WAV file, or a list of paths
             output_dir: Directory to save output MIDI files
             
         Returns:
             List of paths to created MIDI files
         """
-        if not os.path.exists(wav_path):
-            raise FileNotFoundError(f"Input file not found: {wav_path}")
+        if isinstance(wav_path, (str, os.PathLike)):
+            wav_paths = [wav_path]
+        else:
+            wav_paths = list(wav_path)
+
+        for path in wav_paths:
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Input file not found: {path}")
+
+        # Output files are named after the input file, so names must be unique
+        base_names = [os.path.splitext(os.path.basename(path))[0] for path in wav_paths]
+        if len(set(base_names)) != len(base_names):
+            raise ValueError("Input files must have unique names")
         
         # Create output directory if it doesn't exist
         os.makedirs(output_dir, exist_ok=True)
         
-        # Get base filename without extension
-        base_name = os.path.splitext(os.path.basename(wav_path))[0]
+        midi_files = []
+        # One worker pool serves every file, so its processes (and their
+        # librosa imports) are only started once per batch
+        executor = self._pitch_executor()
+        with executor or nullcontext():
+            if len(wav_paths) == 1 or self.config["separation_backend"] != "demucs":
+                for path, base_name in zip(wav_paths, base_names):
+                    # Separate into stems
+                    stems = self.separate_stems(path)
+                    midi_files.extend(self._convert_stems(stems, base_name, output_dir, executor))
+                return midi_files
+
+            # Closing the generator stops demucs before its directory is removed,
+            # even if converting an earlier file fails
+            with tempfile.TemporaryDirectory() as temp_dir, \
+                    closing(self._separate_demucs(wav_paths, temp_dir)) as output_bases:
+                for output_base, base_name in zip(output_bases, base_names):
+                    stems = self._load_stems(output_base)
+                    midi_files.extend(self._convert_stems(stems, base_name, output_dir, executor))
+
+        return midi_files
+
+    def _pitch_executor(self) -> Optional[ProcessPoolExecutor]:
+        """
+        Create the worker pool pYIN tiles are tracked in.
         
-        # Separate into stems
-        stems = self.separate_stems(wav_path)
+        Returns:
+            A ProcessPoolExecutor with stem_workers processes, or None when
+            pitch detection does not use worker processes
+        """
+        workers = self.config.get("stem_workers") or os.cpu_count() or 1
+        if self.config["pitch_detection_method"] != "pyin" or workers < 2:
+            return None
+        return ProcessPoolExecutor(max_workers=workers)
+
+    def _convert_stems(self, stems: Dict[str, np.ndarray], base_name: str, output_dir: str,
+                       executor: Optional[ProcessPoolExecutor] = None) -> List[str]:
+        """
+        Convert separated stems to MIDI files.
         
-        # Convert each stem to MIDI
-        midi_files = []
+        Args:
+            stems: Dictionary with stem names as keys and audio data as values
+            base_name: Base filename for the output MIDI files
+            output_dir: Directory to save output MIDI files
+            executor: Worker pool for pYIN tiles, shared across files; a
+                pool is created for this call when none is given
+            
+        Returns:
+            List of paths to created MIDI files
+        """
+        midi_files = {}
+        active = {}
         for stem_name, stem_audio in stems.items():
+            if stem_name in self.config.get("skip_stems", ()):
+                # Percussive stems have no pitch for pYIN to track
+                print(f"Skipping {stem_name} stem")
+            elif self._is_silent(stem_audio):
+                print(f"No notes detected in {stem_name} stem")
+            else:
+                active[stem_name] = stem_audio
+        
+        sample_rate = self.config["sample_rate"]
+        tiles = {stem_name: self._pitch_tiles(len(stem_audio), sample_rate) for stem_name, stem_audio in active.items()}
+        
+        # pYIN's per-frame probability and Viterbi passes hold the GIL, so
+        # stems are split into tiles that are tracked in worker processes;
+        # otherwise (GPU pitch tracking, or a single worker) all stems share
+        # one batched pitch tracking call
+        workers = min(sum(len(stem_tiles) for stem_tiles in tiles.values()),
+                      self.config.get("stem_workers") or os.cpu_count() or 1)
+        if self.config["pitch_detection_method"] == "pyin" and workers > 1:
+            print(f"Detecting notes in {', '.join(active)} stems in {workers} processes...")
+            with nullcontext(executor) if executor else ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {
+                    stem_name: [
+                        pool.submit(_track_pitch_tile, self.config, stem_audio[start:stop], sample_rate)
+                        for start, stop, _, _, _ in tiles[stem_name]
+                    ]
+                    for stem_name, stem_audio in active.items()
+                }
+                stem_notes = {
+                    stem_name: self._notes_from_pitch(*self._stitch_tiles(tiles[stem_name], stem_futures))
+                    for stem_name, stem_futures in futures.items()
+                }
+        else:
+            print(f"Detecting notes in {', '.join(active)} stems...")
+            stem_notes = self.detect_notes_batch(active, sample_rate)
+        
+        for stem_name, notes in stem_notes.items():
             print(f"Processing {stem_name} stem...")
-            
-            # Detect notes in the stem
-            notes = self.detect_notes(stem_audio, self.config["sample_rate"])
-            
             if not notes:
                 print(f"No notes detected in {stem_name} stem")
                 continue
-                
-            # Convert notes to MIDI
-            midi = self.notes_to_midi(notes, stem_name, self.config["output_bpm"])
+            midi_path = self._save_midi(notes, stem_name, base_name, output_dir)
+            print(f"Saved {midi_path} ({len(notes)} notes)")
+            midi_files[stem_name] = midi_path
+        
+        return [midi_files[stem_name] for stem_name in stems if stem_name in midi_files]
+    
+    def _pitch_tiles(self, n_samples: int, sample_rate: int) -> List[Tuple[int, int, int, int, int]]:
+        """
+        Split a signal into overlapping tiles for independent pitch tracking.
+        
+        Each tile owns about pyin_tile_seconds of frames and is padded with
+        _TILE_OVERLAP seconds of audio on each side, so the frames it owns are
+        tracked with surrounding context much like in a single pass. Tile
+        boundaries fall on hop boundaries, so tile frames line up with the
+        frames of the whole signal.
+        
+        Args:
+            n_samples: Length of the signal
+            sample_rate: Sample rate of the signal
             
-            # Save MIDI file
-            midi_filename = f"{base_name}_{stem_name}.mid"
-            midi_path = os.path.join(output_dir, midi_filename)
-            midi.save(midi_path)
+        Returns:
+            List of (start, stop, first_frame, last_frame, offset) tuples: the
+            tile's audio is signal[start:stop], and its frames from offset on
+            are frames first_frame to last_frame (exclusive) of the signal
+        """
+        hop_length = self.config["hop_length"]
+        n_frames = 1 + n_samples // hop_length
+        tile_seconds = self.config.get("pyin_tile_seconds")
+        if not tile_seconds:
+            return [(0, n_samples, 0, n_frames, 0)]
+        
+        tile_frames = max(1, int(round(tile_seconds * sample_rate / hop_length)))
+        overlap = int(round(self._TILE_OVERLAP * sample_rate / hop_length)) * hop_length
+        tiles = []
+        for first_frame in range(0, n_frames, tile_frames):
+            last_frame = min(first_frame + tile_frames, n_frames)
+            start = max(first_frame * hop_length - overlap, 0)
+            stop = min(last_frame * hop_length + overlap, n_samples)
+            tiles.append((start, stop, first_frame, last_frame, first_frame - start // hop_length))
+        return tiles
+    
+    @staticmethod
+    def _stitch_tiles(tiles: List[Tuple[int, int, int, int, int]],
+                      futures: List[Future]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, float]:
+        """
+        Join the pitch tracks of a signal's tiles into a single track.
+        
+        Args:
+            tiles: Tiles from _pitch_tiles
+            futures: Futures resolving to the _track_pitch output of each tile
             
-            print(f"Saved {midi_path} ({len(notes)} notes)")
-            midi_files.append(midi_path)
+        Returns:
+            Tuple of (f0, voiced_flag, voiced_probs, hop_time) for the whole signal
+        """
+        n_frames = tiles[-1][3]
+        f0 = np.empty(n_frames)
+        voiced_flag = np.empty(n_frames, dtype=bool)
+        voiced_probs = np.empty(n_frames)
+        for (_, _, first_frame, last_frame, offset), future in zip(tiles, futures):
+            tile_f0, tile_voiced_flag, tile_voiced_probs, hop_time = future.result()
+            count = last_frame - first_frame
+            f0[first_frame:last_frame] = tile_f0[offset:offset + count]
+            voiced_flag[first_frame:last_frame] = tile_voiced_flag[offset:offset + count]
+            voiced_probs[first_frame:last_frame] = tile_voiced_probs[offset:offset + count]
+        return f0, voiced_flag, voiced_probs, hop_time
+    
+    def _save_midi(self, notes: NoteArray, stem_name: str, base_name: str, output_dir: str) -> str:
+        """
+        Write the MIDI file for one stem.
         
-        return midi_files
+        Args:
+            notes: Detected notes
+            stem_name: Stem name, used for the instrument and the filename
+            base_name: Base filename for the output MIDI file
+            output_dir: Directory to save the MIDI file
+            
+        Returns:
+            Path to the created MIDI file
+        """
+        midi_filename = f"{base_name}_{stem_name}.mid"
+        midi_path = os.path.join(output_dir, midi_filename)
+        
+        if not self.config.get("fast_midi_writer", True):
+            self.notes_to_midi(notes, stem_name, self.config["output_bpm"]).save(midi_path)
+            return midi_path
+        
+        midi_bytes = self.notes_to_midi_bytes(notes, stem_name, self.config["output_bpm"])
+        with open(midi_path, 'wb') as f:
+            f.write(midi_bytes)
+        return midi_path
+
+
+def _track_pitch_tile(config: Dict, audio: np.ndarray,
+                      sample_rate: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, float]:
+    """
+    Track the pitch of one tile of a stem, in a worker process.
+    
+    This is a module-level function so that it can be pickled for
+    ProcessPoolExecutor.
+    
+    Args:
+        config: Converter configuration
+        audio: Tile audio data
+        sample_rate: Sample rate of audio
+        
+    Returns:
+        Tuple of (f0, voiced_flag, voiced_probs, hop_time) for the tile
+    """
+    return WaveToMIDIConverter(config)._track_pitch(audio, sample_rate)
 
 def main():
     """Main function for command-line interface."""
     parser = argparse.ArgumentParser(
         description="Convert WAV files to MIDI by separating into stems"
     )
-    parser.add_argument("input_wav", help="Input WAV file path")
+    parser.add_argument("input_wav", nargs="+", help="Input WAV file path(s)")
     parser.add_argument("output_dir", help="Output directory for MIDI files")
     parser.add_argument(
         "--config",
@@ -348,9 +1354,10 @@ def main():
         # Create converter with the final configuration
         converter = WaveToMIDIConverter(config)
 
-        # Perform conversion
-        print(f"Converting {args.input_wav} to MIDI...")
-        midi_files = converter.convert(args.input_wav, args.output_dir)
+        # Perform conversion; several inputs share one separation run
+        input_wavs = args.input_wav[0] if len(args.input_wav) == 1 else args.input_wav
+        print(f"Converting {', '.join(args.input_wav)} to MIDI...")
+        midi_files = converter.convert(input_wavs, args.output_dir)
 
         print(f"\nConversion complete!")
         print(f"Created {len(midi_files)} MIDI files:")